@@ -1,48 +1,53 @@
-from spade.agent import Agent
 from spade.behaviour import CyclicBehaviour, PeriodicBehaviour
-from spade.message import Message
-from spade.template import Template
-import json
 import random
-import time
+import sys
 from typing import Tuple, Any, Dict, Optional
-import yaml
 import asyncio
+import logging
+from agents.bus_agent import BusAgent
 
+logger = logging.getLogger(__name__)
 
-class BinAgent(Agent):
+
+class BinAgent(BusAgent):
     def __init__(self, jid: str, password: str, environment: Any, position: Tuple[int, int],
-                 config_path: str = "config.yaml"):
-        super().__init__(jid, password)
-        self.env = environment
+                 config_path: Optional[str] = None):
+        super().__init__(jid, password, environment)
         self.position = position
 
-        # Load configuration
         try:
-            with open(config_path, 'r') as f:
-                config = yaml.safe_load(f)
+            config = environment.agent_config(config_path)
             self.config = config['agents']['bin']
 
             # Get number of trucks from config
-            num_trucks = config['agents']['counts']['trucks']
-            self.truck_jids = [f"truck{i}@localhost" for i in range(1, num_trucks + 1)]
+            self.num_trucks = config['agents']['counts']['trucks']
+            self.truck_jids = [sys.intern(f"truck{i}@localhost") for i in range(1, self.num_trucks + 1)]
 
         except Exception as e:
-            print(f"Error loading config for bin {jid}: {e}")
+            logger.error("Error loading config for bin %s: %s", jid, e)
             raise
 
         # Initialize parameters from config
         self.monitor_period = self.config['monitor_period']
         self.capacity = self.config['capacity']
         self.threshold = self.config['threshold']
+        self.collection_trigger = self.capacity * self.threshold
+        self.fill_min = self.config['fill_rate']['min']
+        self.fill_max = self.config['fill_rate']['max']
+        self.fill_delta = self.fill_max - self.fill_min
+
+        # Fill rate multiplier by hour: bins fill at half rate overnight (00:00-06:00)
+        self.time_multipliers = [0.5] * 7 + [1.0] * 17
         self.current_level = 0
 
         # Proposal handling
         self.waiting_for_collection = False
-        self.cfp_start_time: Optional[float] = None
-        self.proposal_timeout = 5
+        self.proposal_timeout = self.config['proposal_timeout']
+        self.collection_timeout = self.config['collection_timeout']  # seconds to hear back from the selected truck
         self.proposals: Dict[str, float] = {}
         self.trucks_responded = set()
+        self.all_responded = asyncio.Event()
+        self.cfp_task: Optional[asyncio.Task] = None
         self.selected_truck: Optional[str] = None
         self.last_collection_time: Optional[float] = None
 
@@ -57,14 +62,54 @@ class BinAgent(Agent):
         self.monitor_behaviour = None
         self.handle_proposals = None
 
+    def broadcast(self, recipients, performative: str, payload: Any):
+        """Post one shared message envelope to several agents"""
+        envelope = (performative, self.jid_str, payload)
+        post = self.env.post
+        for to in recipients:
+            post(to, envelope)
+
     def reset_collection_state(self):
         """Reset all collection-related state"""
         self.waiting_for_collection = False
-        self.cfp_start_time = None
         self.proposals.clear()
         self.trucks_responded.clear()
+        self.all_responded.clear()
         self.selected_truck = None
 
+    def start_proposal_round(self):
+        """Reset proposal state and start collecting answers to a new CFP"""
+        self.reset_collection_state()
+        self.waiting_for_collection = True
+        if self.cfp_task is not None and not self.cfp_task.done():
+            self.cfp_task.cancel()
+        self.cfp_task = asyncio.create_task(self.collect_proposals())
+
+    async def collect_proposals(self):
+        """Wait until every truck has answered or the proposal timeout expires, select, then await the collection"""
+        try:
+            await asyncio.wait_for(self.all_responded.wait(), timeout=self.proposal_timeout)
+        except asyncio.TimeoutError:
+            logger.info("Bin %s proposal collection timeout", self.jid)
+        await self.handle_proposals.select_best_proposal()
+
+        # The selected truck's inform resets the round; if none arrives in time, tender again
+        selected_truck = self.selected_truck
+        if selected_truck is None:
+            return
+        await asyncio.sleep(self.collection_timeout)
+        if self.waiting_for_collection and self.selected_truck == selected_truck:
+            logger.warning("Bin %s heard nothing from %s within %ss, sending a new CFP",
+                           self.jid, selected_truck, self.collection_timeout)
+            self.cfp_task = None  # this task; the new round must not cancel it mid-call
+            await self.monitor_behaviour.initiate_cfp()
+
+    def record_response(self, sender: str):
+        """Record a truck's answer to the current CFP"""
+        self.trucks_responded.add(sender)
+        if len(self.trucks_responded) == self.num_trucks:
+            self.all_responded.set()
+
     def record_collection(self):
         """Record a successful collection"""
         self.total_collections_received += 1
@@ -78,139 +123,115 @@ class BinAgent(Agent):
     class MonitorLevel(PeriodicBehaviour):
         async def run(self):
             try:
-                if self.agent.waiting_for_collection:
-                    # Check if we've waited too long for proposals
-                    if (self.agent.cfp_start_time and
-                            time.time() - self.agent.cfp_start_time >= self.agent.proposal_timeout):
-                        await self.handle_proposal_timeout()
-                    return
-
                 # Consider time of day for fill rate
-                time_multiplier = 0.5 if 0 <= self.agent.env.current_time <= 6 else 1.0
-                fill_rate = random.uniform(
-                    self.agent.config['fill_rate']['min'],
-                    self.agent.config['fill_rate']['max']
-                ) * time_multiplier
+                time_multiplier = self.agent.time_multipliers[self.agent.env.current_time]
+                fill_rate = (self.agent.fill_min + self.agent.fill_delta * random.random()) * time_multiplier
 
                 # Calculate new level but don't exceed capacity
                 new_level = self.agent.current_level + fill_rate
                 if new_level > self.agent.capacity:
                     self.agent.current_level = self.agent.capacity
-                    print(f"Bin {self.agent.jid} is full! Level: {self.agent.current_level:.2f}/{self.agent.capacity}")
+                    logger.debug("Bin %s is full! Level: %.2f/%s", self.agent.jid, self.agent.current_level,
+                                 self.agent.capacity)
                 else:
                     self.agent.current_level = new_level
-                    print(f"Bin {self.agent.jid} level: {self.agent.current_level:.2f}/{self.agent.capacity}")
+                    logger.debug("Bin %s level: %.2f/%s", self.agent.jid, self.agent.current_level, self.agent.capacity)
 
                 # Record waste generation
                 self.agent.record_waste_generation(fill_rate)
 
-                if self.agent.current_level >= self.agent.capacity * self.agent.threshold:
-                    print(f"Bin {self.agent.jid} needs collection! Level: {self.agent.current_level:.2f}")
+                # Keep filling while a collection is pending, but only tender once
+                if self.agent.current_level >= self.agent.collection_trigger and not self.agent.waiting_for_collection:
+                    logger.debug("Bin %s needs collection! Level: %.2f", self.agent.jid, self.agent.current_level)
                     await self.initiate_cfp()
 
             except Exception as e:
-                print(f"Error in MonitorLevel for bin {self.agent.jid}: {e}")
-
-        async def handle_proposal_timeout(self):
-            """Handle timeout for proposal collection"""
-            print(f"Bin {self.agent.jid} proposal collection timeout")
-            if not self.agent.proposals:
-                print(f"Bin {self.agent.jid} received no proposals, will try again later")
-                self.agent.reset_collection_state()
-                return
-            await self.agent.handle_proposals.select_best_proposal()
+                logger.error("Error in MonitorLevel for bin %s: %s", self.agent.jid, e)
 
         async def initiate_cfp(self):
             """Initiate Call for Proposals"""
             try:
-                self.agent.waiting_for_collection = True
-                self.agent.cfp_start_time = time.time()
-                self.agent.proposals.clear()
-                self.agent.trucks_responded.clear()
-                self.agent.selected_truck = None
-
-                # Send CFP to all trucks
-                for truck_jid in self.agent.truck_jids:
-                    msg = Message(to=truck_jid)
-                    msg.set_metadata("performative", "cfp")
-                    data = {
-                        "position": list(self.agent.position),
-                        "level": self.agent.current_level,
-                        "time": self.agent.env.current_time,
-                        "last_collection_time": self.agent.last_collection_time
-                    }
-                    msg.body = json.dumps(data)
-                    await self.send(msg)
-                    print(f"Bin {self.agent.jid} sent CFP to {truck_jid} for collection at time {self.agent.env.current_time}")
+                self.agent.start_proposal_round()
+
+                # Send the same CFP payload to all trucks
+                data = {
+                    "position": list(self.agent.position),
+                    "level": self.agent.current_level,
+                    "time": self.agent.env.current_time,
+                    "last_collection_time": self.agent.last_collection_time
+                }
+                self.agent.broadcast(self.agent.truck_jids, "cfp", data)
+                logger.debug("Bin %s sent CFP to %d trucks for collection at time %s",
+                             self.agent.jid, self.agent.num_trucks, self.agent.env.current_time)
             except Exception as e:
-                print(f"Error initiating CFP for bin {self.agent.jid}: {e}")
+                logger.error("Error initiating CFP for bin %s: %s", self.agent.jid, e)
                 self.agent.reset_collection_state()
 
     class HandleProposals(CyclicBehaviour):
+        async def on_start(self):
+            # Handlers by performative, built once instead of branching per message
+            self._dispatch = {
+                "propose": self.handle_proposal,
+                "inform": self.handle_inform,
+                "refuse": self.handle_refuse
+            }
+
         async def run(self):
             try:
-                msg = await self.receive(timeout=10)
-                if not msg:
-                    return
+                performative, sender, payload = await self.agent.mailbox.get()
 
-                performative = msg.metadata.get("performative")
-                if not performative:
-                    print(f"Received message without performative from {msg.sender}")
+                handler = self._dispatch.get(performative)
+                if handler is None:
+                    logger.warning("Bin %s ignoring unexpected %s from %s", self.agent.jid, performative, sender)
                     return
-
-                if performative == "propose":
-                    await self.handle_proposal(msg)
-                elif performative == "inform":
-                    await self.handle_inform(msg)
-                elif performative == "refuse":
-                    await self.handle_refuse(msg)
+                await handler(sender, payload)
 
             except Exception as e:
-                print(f"Error in HandleProposals for bin {self.agent.jid}: {e}")
+                logger.error("Error in HandleProposals for bin %s: %s", self.agent.jid, e)
 
-        async def handle_proposal(self, msg):
+        async def handle_proposal(self, sender: str, cost: float):
             """Handle proposal messages"""
-            sender = str(msg.sender)
-            if sender not in self.agent.trucks_responded and not self.agent.selected_truck:
+            if (self.agent.waiting_for_collection and sender not in self.agent.trucks_responded
+                    and not self.agent.selected_truck):
                 try:
-                    cost = float(msg.body)
-                    print(f"Bin {self.agent.jid} received proposal from {sender}: Cost = {cost}")
+                    cost = float(cost)
+                    logger.debug("Bin %s received proposal from %s: Cost = %s", self.agent.jid, sender, cost)
                     self.agent.proposals[sender] = cost
-                    self.agent.trucks_responded.add(sender)
-
-                    if len(self.agent.trucks_responded) == len(self.agent.truck_jids):
-                        await self.select_best_proposal()
+                    self.agent.record_response(sender)
                 except ValueError:
-                    print(f"Invalid cost value received from {sender}")
+                    logger.warning("Invalid cost value received from %s", sender)
 
-        async def handle_refuse(self, msg):
+        async def handle_refuse(self, sender: str, reason: str):
             """Handle refuse messages"""
-            sender = str(msg.sender)
             try:
-                if msg.body == "MALFUNCTIONED":
-                    print(f"Bin {self.agent.jid} received refusal from {sender} - truck is under repair")
+                if reason == "MALFUNCTIONED":
+                    logger.debug("Bin %s received refusal from %s - truck is under repair", self.agent.jid, sender)
                 else:
-                    print(f"Bin {self.agent.jid} received refusal from {sender} - {msg.body}")
+                    logger.debug("Bin %s received refusal from %s - %s", self.agent.jid, sender, reason)
+
+                if not self.agent.waiting_for_collection or self.agent.selected_truck:
+                    return
 
                 if sender in self.agent.proposals:
                     del self.agent.proposals[sender]
-                self.agent.trucks_responded.add(sender)
-
-                if len(self.agent.trucks_responded) == len(self.agent.truck_jids):
-                    await self.select_best_proposal()
+                self.agent.record_response(sender)
             except Exception as e:
-                print(f"Error handling refusal from {sender}: {e}")
+                logger.error("Error handling refusal from %s: %s", sender, e)
 
-        async def handle_inform(self, msg):
+        async def handle_inform(self, sender: str, data: Dict[str, Any]):
             """Handle inform messages"""
-            sender = str(msg.sender)
             try:
-                data = json.loads(msg.body)
+                # Only the truck serving the current collection may change its state; anything else
+                # is a late duplicate about an earlier round (e.g. after a malfunction re-CFP)
+                if sender != self.agent.selected_truck:
+                    logger.debug("Bin %s ignoring %s from %s, not the assigned truck",
+                                 self.agent.jid, data.get("status"), sender)
+                    return
 
                 if "status" in data:
                     if data["status"] == "TRUCK_MALFUNCTION":
-                        print(f"Bin {self.agent.jid}: Truck {sender} malfunctioned during collection")
-                        print(f"Repair time: {data['repair_time']:.2f} hours")
+                        logger.info("Bin %s: Truck %s malfunctioned during collection (repair time: %.2f hours)",
+                                    self.agent.jid, sender, data['repair_time'])
                         # Reset state but maintain waste level
                         self.agent.reset_collection_state()
                         # Initiate new CFP after a short delay
@@ -218,131 +239,96 @@ class BinAgent(Agent):
                         await self.initiate_new_cfp()
 
                     elif data["status"] == "COLLECTION_COMPLETE":
-                        print(f"Bin {self.agent.jid} has been emptied and will resume filling")
+                        logger.info("Bin %s has been emptied and will resume filling", self.agent.jid)
                         self.agent.current_level = 0
                         self.agent.last_collection_time = self.agent.env.current_time
                         self.agent.record_collection()
                         self.agent.reset_collection_state()
 
+                    elif data["status"] == "COLLECTION_FAILED":
+                        logger.info("Bin %s: collection by %s failed, tendering again", self.agent.jid, sender)
+                        # Usually a declined acceptance: the truck took another bin first, and another
+                        # truck may be free now, so tender again rather than wait for the next level check
+                        await self.agent.monitor_behaviour.initiate_cfp()
+
             except Exception as e:
-                print(f"Error handling inform message from {sender}: {e}")
+                logger.error("Error handling inform message from %s: %s", sender, e)
 
         async def initiate_new_cfp(self):
             """Initiate a new CFP if a truck malfunctions"""
             try:
-                print(f"Bin {self.agent.jid} initiating new CFP after truck malfunction")
-                self.agent.waiting_for_collection = True
-                self.agent.cfp_start_time = time.time()
-                self.agent.proposals.clear()
-                self.agent.trucks_responded.clear()
-                self.agent.selected_truck = None
-
-                for truck_jid in self.agent.truck_jids:
-                    msg = Message(to=truck_jid)
-                    msg.set_metadata("performative", "cfp")
-                    data = {
-                        "position": list(self.agent.position),
-                        "level": self.agent.current_level,
-                        "time": self.agent.env.current_time,
-                        "last_collection_time": self.agent.last_collection_time,
-                        "is_retry": True
-                    }
-                    msg.body = json.dumps(data)
-                    await self.send(msg)
-                print(f"Bin {self.agent.jid} sent new CFPs after malfunction")
+                logger.info("Bin %s initiating new CFP after truck malfunction", self.agent.jid)
+                self.agent.start_proposal_round()
+
+                data = {
+                    "position": list(self.agent.position),
+                    "level": self.agent.current_level,
+                    "time": self.agent.env.current_time,
+                    "last_collection_time": self.agent.last_collection_time,
+                    "is_retry": True
+                }
+                self.agent.broadcast(self.agent.truck_jids, "cfp", data)
+                logger.debug("Bin %s sent new CFPs after malfunction", self.agent.jid)
             except Exception as e:
-                print(f"Error initiating new CFP after malfunction: {e}")
+                logger.error("Error initiating new CFP after malfunction: %s", e)
                 self.agent.reset_collection_state()
 
         async def select_best_proposal(self):
             """Select the best proposal considering costs and randomization"""
             if not self.agent.proposals or self.agent.selected_truck:
                 if not self.agent.proposals:
-                    print(f"Bin {self.agent.jid} has no valid proposals, will try again later")
+                    logger.info("Bin %s has no valid proposals, will try again later", self.agent.jid)
                 self.agent.reset_collection_state()
                 return
 
             try:
-                # Group proposals by cost
-                proposals_by_cost = {}
+                # Find the lowest cost and the trucks tied on it in a single pass
+                min_cost = float('inf')
+                cheapest_trucks = []
                 for truck_jid, cost in self.agent.proposals.items():
                     cost_key = round(cost, 2)
-                    if cost_key not in proposals_by_cost:
-                        proposals_by_cost[cost_key] = []
-                    proposals_by_cost[cost_key].append(truck_jid)
+                    if cost_key < min_cost:
+                        min_cost = cost_key
+                        cheapest_trucks = [truck_jid]
+                    elif cost_key == min_cost:
+                        cheapest_trucks.append(truck_jid)
 
-                # Get the lowest cost
-                min_cost = min(proposals_by_cost.keys())
-                selected_truck = random.choice(proposals_by_cost[min_cost])
+                selected_truck = random.choice(cheapest_trucks)
                 self.agent.selected_truck = selected_truck
 
                 # Add this line to track the cost
                 self.agent.total_mission_costs += min_cost
 
-                print(f"Bin {self.agent.jid} selecting proposal from {selected_truck}")
-
-                # First send rejections to non-selected trucks
-                await self.send_rejections(selected_truck, min_cost)
+                logger.info("Bin %s selecting proposal from %s", self.agent.jid, selected_truck)
 
-                # Then send acceptance to selected truck
+                # Only the winner is notified; other bidders treat silence as rejection
                 await self.send_acceptance(selected_truck)
 
             except Exception as e:
-                print(f"Error selecting best proposal for bin {self.agent.jid}: {e}")
+                logger.error("Error selecting best proposal for bin %s: %s", self.agent.jid, e)
                 self.agent.reset_collection_state()
 
-        async def send_rejections(self, selected_truck: str, selected_cost: float):
-            """Send reject-proposal messages to all non-selected trucks"""
-            try:
-                for truck_jid in self.agent.proposals.keys():
-                    if truck_jid != selected_truck:
-                        reject_msg = Message(to=truck_jid)
-                        reject_msg.set_metadata("performative", "reject-proposal")
-                        data = {
-                            "reason": "better_proposal_selected",
-                            "selected_cost": selected_cost,
-                            "your_cost": self.agent.proposals[truck_jid]
-                        }
-                        reject_msg.body = json.dumps(data)
-                        await self.send(reject_msg)
-                        print(f"Bin {self.agent.jid} sent rejection to {truck_jid}")
-            except Exception as e:
-                print(f"Error sending rejections: {e}")
-
         async def send_acceptance(self, selected_truck: str):
             """Send acceptance message to selected truck"""
             try:
-                accept_msg = Message(to=selected_truck)
-                accept_msg.set_metadata("performative", "accept-proposal")
                 data = {
                     "position": list(self.agent.position),
                     "level": self.agent.current_level,
                     "time": self.agent.env.current_time
                 }
-                accept_msg.body = json.dumps(data)
-                await self.send(accept_msg)
-                print(f"Bin {self.agent.jid} accepted proposal from {selected_truck}")
+                self.agent.send_message(selected_truck, "accept-proposal", data)
+                logger.debug("Bin %s accepted proposal from %s", self.agent.jid, selected_truck)
             except Exception as e:
-                print(f"Error sending acceptance to {selected_truck}: {e}")
+                logger.error("Error sending acceptance to %s: %s", selected_truck, e)
                 self.agent.reset_collection_state()
 
     async def setup(self):
-        print(f"Bin {self.jid} starting at position {self.position}")
-
-        # Create templates for message filtering
-        propose_template = Template()
-        propose_template.set_metadata("performative", "propose")
-
-        inform_template = Template()
-        inform_template.set_metadata("performative", "inform")
-
-        refuse_template = Template()
-        refuse_template.set_metadata("performative", "refuse")
+        logger.info("Bin %s starting at position %s", self.jid, self.position)
 
         # Initialize and store behaviors
         self.monitor_behaviour = self.MonitorLevel(period=self.monitor_period)
         self.handle_proposals = self.HandleProposals()
 
-        # Add behaviors with templates
+        # Add behaviors
         self.add_behaviour(self.monitor_behaviour)
-        self.add_behaviour(self.handle_proposals, template=propose_template | inform_template | refuse_template)
+        self.add_behaviour(self.handle_proposals)
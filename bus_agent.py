@@ -0,0 +1,20 @@
+from spade.agent import Agent
+import asyncio
+import sys
+from typing import Any
+
+
+class BusAgent(Agent):
+    """SPADE agent that talks to other agents through the environment's in-process message bus"""
+
+    def __init__(self, jid: str, password: str, environment: Any):
+        super().__init__(jid, password)
+        self.env = environment
+        self.jid_str = sys.intern(jid)
+
+        # Registered on construction, so messages sent before setup() are queued rather than dropped
+        self.mailbox: asyncio.Queue = environment.register_mailbox(self.jid_str)
+
+    def send_message(self, to: str, performative: str, payload: Any):
+        """Post a (performative, sender, payload) envelope to another agent"""
+        self.env.post(to, (performative, self.jid_str, payload))
@@ -1,19 +1,45 @@
+import asyncio
+import functools
+import logging
 import random
 import yaml
 from dataclasses import dataclass
-from typing import Tuple, List
+from typing import Any, Tuple, List, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# libyaml-backed loader when available, much faster than the pure-Python one
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def read_config(config_path: str = "config.yaml") -> dict:
+    """Parse a configuration file into a new dict"""
+    with open(config_path, 'r') as f:
+        return yaml.load(f, Loader=YamlLoader)
+
+
+@functools.lru_cache(maxsize=None)
+def load_config(config_path: str = "config.yaml") -> dict:
+    """Parse a configuration file once; later calls share the same read-only dict"""
+    return read_config(config_path)
+
 
 class Environment:
     def __init__(self, config_path: str = "config.yaml"):
-        # Load configuration
-        with open(config_path, 'r') as f:
-            self.config = yaml.safe_load(f)
+        # Load configuration; each environment gets its own copy, so runs can change it freely
+        self.config = read_config(config_path)
 
         # Basic parameters
         self.size = self.config['grid']['size']
         self.current_time = 0
         self.current_day = 1
 
+        # Traffic multiplier for each hour of the day (rush hour ranges are inclusive)
+        self._hour_traffic = [1.0] * 24
+        for rush_hour in self.config['time']['rush_hours'].values():
+            for hour in range(rush_hour['start'], rush_hour['end'] + 1):
+                self._hour_traffic[hour] = rush_hour['traffic_multiplier']
+
         # Initialize locations
         self.depot = {
             "position": tuple(self.config['locations']['depot']['position'])
@@ -23,39 +49,81 @@ class Environment:
             for station in self.config['locations']['fuel_stations']
         ]
 
+        # Cells where traffic events may not be placed
+        self._forbidden_positions = {
+            self.depot["position"],
+            *(station["position"] for station in self.fuel_stations)
+        }
+
         # traffic events
         self.active_events: List[TrafficEvent] = []
         self.total_events = 0
 
+        # Cell -> strongest multiplier of the events covering it, rebuilt when events change
+        self._event_cells: Dict[Tuple[int, int], float] = {}
+
+        # Travel costs only change with the hour or the active events; cleared on either
+        self._travel_cost_cache: Dict[Tuple[Tuple[int, int], Tuple[int, int]], float] = {}
+
+        # In-process mailboxes keyed by agent JID, created by register_mailbox
+        self.message_bus: Dict[str, asyncio.Queue] = {}
+
+    def agent_config(self, config_path: Optional[str] = None) -> dict:
+        """Configuration for an agent: this environment's, unless a separate file is given"""
+        return self.config if config_path is None else load_config(config_path)
+
+    def register_mailbox(self, jid: str) -> asyncio.Queue:
+        """Create the in-process mailbox messages to this JID are delivered to"""
+        mailbox = self.message_bus[jid] = asyncio.Queue()
+        return mailbox
+
+    def post(self, to: str, envelope: Tuple[str, str, Any]):
+        """Deliver a (performative, sender, payload) envelope to a registered mailbox"""
+        mailbox = self.message_bus.get(to)
+        if mailbox is None:
+            logger.error("Dropping %s from %s: no agent registered as %s", envelope[0], envelope[1], to)
+            return
+        mailbox.put_nowait(envelope)
+
+    def get_absolute_hour(self) -> int:
+        """Hours elapsed since the start of day 1"""
+        return (self.current_day - 1) * 24 + self.current_time
+
     def calculate_distance(self, start: Tuple[int, int], end: Tuple[int, int]) -> int:
         """Calculate Manhattan distance between two points"""
         return abs(end[0] - start[0]) + abs(end[1] - start[1])
 
     def is_rush_hour(self) -> bool:
-        """Simple check for rush hour periods"""
-        morning_rush = (7 <= self.current_time <= 9)
-        evening_rush = (17 <= self.current_time <= 19)
-        return morning_rush or evening_rush
+        """Check whether the current hour falls in a configured rush hour period"""
+        return self._hour_traffic[self.current_time] != 1.0
 
     def get_rush_hour_multiplier(self) -> float:
         """Get traffic multiplier for rush hours"""
-        if not self.is_rush_hour():
-            return 1.0
-
-        if 7 <= self.current_time <= 9:
-            return self.config['time']['rush_hours']['morning']['traffic_multiplier']
-        else:  # 17-19
-            return self.config['time']['rush_hours']['evening']['traffic_multiplier']
+        return self._hour_traffic[self.current_time]
 
     def check_traffic_event(self, position: Tuple[int, int]) -> float:
         """Check if position is affected by any traffic event"""
+        return self._event_cells.get(position, 1.0)
+
+    def _rebuild_event_cells(self) -> None:
+        """Stamp each active event's multiplier onto the cells within 2 steps of it"""
+        cells = {}
         for event in self.active_events:
-            if self.calculate_distance(position, event.position) <= 2:
-                return event.multiplier
-        return 1.0
+            ex, ey = event.position
+            for x in range(max(0, ex - 2), min(self.size, ex + 3)):
+                spread = 2 - abs(x - ex)
+                for y in range(max(0, ey - spread), min(self.size, ey + spread + 1)):
+                    if event.multiplier > cells.get((x, y), 1.0):
+                        cells[(x, y)] = event.multiplier
+        self._event_cells = cells
+        self._travel_cost_cache.clear()
 
     def get_travel_cost(self, start: Tuple[int, int], end: Tuple[int, int]) -> float:
         """Calculate travel cost considering rush hour and events"""
+        cached = self._travel_cost_cache.get((start, end))
+        if cached is not None:
+            return cached
+
         base_distance = self.calculate_distance(start, end)
 
         # Get the highest applicable multiplier
@@ -68,11 +136,14 @@ class Environment:
         # Use the highest multiplier effect
         final_multiplier = max(rush_multiplier, event_multiplier)
 
-        return base_distance * final_multiplier
+        cost = base_distance * final_multiplier
+        self._travel_cost_cache[(start, end)] = cost
+        return cost
 
     def step_time(self) -> None:
         """Advance time by one hour"""
         self.current_time += 1
+        self._travel_cost_cache.clear()
 
         # Handle day transition
         if self.current_time >= 24:
@@ -80,10 +151,13 @@ class Environment:
             self.current_day += 1
 
         # Update active events
+        num_events = len(self.active_events)
         self.active_events = [
             event for event in self.active_events
             if event.duration > 0
         ]
+        if len(self.active_events) != num_events:
+            self._rebuild_event_cells()
 
         # Decrease duration of active events
         for event in self.active_events:
@@ -109,8 +183,7 @@ class Environment:
         # Find a valid position
         while True:
             pos = (random.randint(0, self.size - 1), random.randint(0, self.size - 1))
-            if (pos != self.depot["position"] and
-                    pos not in [station["position"] for station in self.fuel_stations]):
+            if pos not in self._forbidden_positions:
                 break
 
         # Set event properties
@@ -126,7 +199,8 @@ class Environment:
 
         self.active_events.append(new_event)
         self.total_events += 1
-        print(f"New {event_type} at {pos}, duration: {duration}h, multiplier: {multiplier}x")
+        self._rebuild_event_cells()
+        logger.info("New %s at %s, duration: %sh, multiplier: %sx", event_type, pos, duration, multiplier)
 
     def get_event_statistics(self) -> dict:
         """Simple event statistics"""
@@ -135,7 +209,7 @@ class Environment:
             'active_events': len(self.active_events)
         }
 
-@dataclass
+@dataclass(slots=True)
 class TrafficEvent:
     """Simplified traffic event in the simulation"""
     position: Tuple[int, int]
@@ -1,10 +1,15 @@
 import pygame
-from typing import Tuple
+from typing import Tuple, Dict
 
 
 class GridVisualizer:
-    def __init__(self, grid_size: int, cell_size: int = 50):
-        """Initialize the grid visualizer"""
+    def __init__(self, grid_size: int, cell_size: int = 50, enabled: bool = True, max_fps: float = 30):
+        """Initialize the grid visualizer; a disabled visualizer never touches pygame"""
+        self.enabled = enabled
+        self.render_interval = 1.0 / max_fps  # callers skip update_display within this interval
+        if not enabled:
+            return
+
         pygame.init()
         self.grid_size = grid_size
         self.cell_size = cell_size
@@ -36,49 +41,86 @@ class GridVisualizer:
         self.font = pygame.font.Font(None, 24)
         self.small_font = pygame.font.Font(None, 20)
 
-    def draw_grid(self):
+        # Grid, depot and fuel stations never change; rendered once on first update
+        self._background = None
+
+        # Rendered text surfaces for labels that repeat across frames
+        self._text_cache: Dict[tuple, pygame.Surface] = {}
+
+    def _render(self, text: str, color: Tuple[int, int, int], font: pygame.font.Font) -> pygame.Surface:
+        """Render text once and reuse the surface on later calls"""
+        key = (text, color, font)
+        surface = self._text_cache.get(key)
+        if surface is None:
+            surface = font.render(text, True, color)
+            self._text_cache[key] = surface
+        return surface
+
+    def draw_grid(self, surface: pygame.Surface):
         """Draw the basic grid"""
-        self.screen.fill(self.COLORS['background'])
+        surface.fill(self.COLORS['background'])
 
-        # Draw grid lines
+        # Draw grid lines as one serpentine polyline per axis; the connecting
+        # segments run along the outer border, which is a grid line anyway
+        start, end = self.padding, self.window_size - self.padding
+        vertical, horizontal = [], []
         for i in range(self.grid_size + 1):
             pos = i * self.cell_size + self.padding
-            pygame.draw.line(self.screen, self.COLORS['grid'],
-                             (pos, self.padding),
-                             (pos, self.window_size - self.padding))
-            pygame.draw.line(self.screen, self.COLORS['grid'],
-                             (self.padding, pos),
-                             (self.window_size - self.padding, pos))
+            ends = (start, end) if i % 2 == 0 else (end, start)
+            vertical.extend([(pos, ends[0]), (pos, ends[1])])
+            horizontal.extend([(ends[0], pos), (ends[1], pos)])
+        pygame.draw.lines(surface, self.COLORS['grid'], False, vertical)
+        pygame.draw.lines(surface, self.COLORS['grid'], False, horizontal)
+
+    def render_background(self, env) -> pygame.Surface:
+        """Render the static parts of the scene (grid, depot, fuel stations)"""
+        background = pygame.Surface(self.screen.get_size())
+        self.draw_grid(background)
+
+        # Draw depot
+        self.draw_element(env.depot["position"], self.COLORS['depot'], "D", "Depot", surface=background)
+
+        # Draw fuel stations
+        for station in env.fuel_stations:
+            self.draw_element(station["position"], self.COLORS['fuel'], "F", "Fuel", surface=background)
+
+        return background
 
     def draw_element(self, position: Tuple[int, int], color: Tuple[int, int, int],
-                     text: str, info_text: str = None):
+                     text: str, info_text: str = None, surface: pygame.Surface = None,
+                     cache_info: bool = True):
         """Draw a grid element"""
+        if surface is None:
+            surface = self.screen
         x, y = position
         center = (x * self.cell_size + self.cell_size // 2 + self.padding,
                   y * self.cell_size + self.cell_size // 2 + self.padding)
 
         # Draw circle with outline
-        pygame.draw.circle(self.screen, color, center, self.cell_size // 3)
-        pygame.draw.circle(self.screen, (0, 0, 0), center, self.cell_size // 3, 2)
+        pygame.draw.circle(surface, color, center, self.cell_size // 3)
+        pygame.draw.circle(surface, (0, 0, 0), center, self.cell_size // 3, 2)
 
         # Draw main text (identifier)
-        text_surface = self.font.render(text, True, (255, 255, 255))
+        text_surface = self._render(text, (255, 255, 255), self.font)
         text_rect = text_surface.get_rect(center=center)
-        self.screen.blit(text_surface, text_rect)
+        surface.blit(text_surface, text_rect)
 
         # Draw info text above the element
         if info_text:
-            info_surface = self.small_font.render(info_text, True, (0, 0, 0))
+            if cache_info:
+                info_surface = self._render(info_text, (0, 0, 0), self.small_font)
+            else:
+                info_surface = self.small_font.render(info_text, True, (0, 0, 0))
             info_rect = info_surface.get_rect(
                 midbottom=(center[0], center[1] - self.cell_size // 3 - 5)
             )
 
             # Draw white background for text
             bg_rect = info_rect.inflate(10, 6)
-            pygame.draw.rect(self.screen, (255, 255, 255), bg_rect)
-            pygame.draw.rect(self.screen, (200, 200, 200), bg_rect, 1)
+            pygame.draw.rect(surface, (255, 255, 255), bg_rect)
+            pygame.draw.rect(surface, (200, 200, 200), bg_rect, 1)
 
-            self.screen.blit(info_surface, info_rect)
+            surface.blit(info_surface, info_rect)
 
     def draw_status_bar(self, env, trucks, bins):
         """Draw status bar with simulation information including day"""
@@ -97,30 +139,32 @@ class GridVisualizer:
         total_waste = sum(bin_agent.total_waste_generated for bin_agent in bins)
         traffic_status = "RUSH HOUR" if (7 <= env.current_time <= 9 or 17 <= env.current_time <= 19) else "Normal"
 
+        white = (255, 255, 255)
         status_texts = [
-            f"Day: {current_day}/7",
-            f"Time: {time_str}",
-            f"Traffic: {traffic_status}",
-            f"Collections: {total_collections}",
-            f"Waste: {total_waste:.1f}"
+            ("Day: ", self.small_font.render(f"{current_day}/7", True, white)),
+            ("Time: ", self.small_font.render(time_str, True, white)),
+            ("Traffic: ", self._render(traffic_status, white, self.small_font)),
+            ("Collections: ", self.small_font.render(str(total_collections), True, white)),
+            ("Waste: ", self.small_font.render(f"{total_waste:.1f}", True, white))
         ]
 
+        # Static labels come from the cache, only the values are rendered each frame
         x_offset = 10
-        for text in status_texts:
-            text_surface = self.small_font.render(text, True, (255, 255, 255))
-            self.screen.blit(text_surface, (x_offset, self.window_size + 12))
-            x_offset += text_surface.get_width() + 20
+        for label, value_surface in status_texts:
+            label_surface = self._render(label, white, self.small_font)
+            self.screen.blit(label_surface, (x_offset, self.window_size + 12))
+            x_offset += label_surface.get_width()
+            self.screen.blit(value_surface, (x_offset, self.window_size + 12))
+            x_offset += value_surface.get_width() + 20
 
     def update_display(self, env, trucks, bins):
         """Update the display with current simulation state"""
-        self.draw_grid()
+        if not self.enabled:
+            return
 
-        # Draw depot
-        self.draw_element(env.depot["position"], self.COLORS['depot'], "D", "Depot")
-
-        # Draw fuel stations
-        for station in env.fuel_stations:
-            self.draw_element(station["position"], self.COLORS['fuel'], "F", "Fuel")
+        if self._background is None:
+            self._background = self.render_background(env)
+        self.screen.blit(self._background, (0, 0))
 
         # Draw bins with consistent color
         for bin_agent in bins:
@@ -131,13 +175,15 @@ class GridVisualizer:
         for i, truck in enumerate(trucks):
             status = f"F:{truck.fuel_level:.0f} W:{truck.current_waste:.0f}"
             color = self.COLORS['truck_busy'] if truck.busy else self.COLORS['truck_idle']
-            self.draw_element(truck.position, color, f"T{i + 1}", status)
+            self.draw_element(truck.position, color, f"T{i + 1}", status, cache_info=False)
 
         self.draw_status_bar(env, trucks, bins)
         pygame.display.flip()
 
     def close(self):
         """Close the pygame window and quit pygame"""
+        if not self.enabled:
+            return
         try:
             pygame.display.quit()
             pygame.quit()
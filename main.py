@@ -1,17 +1,24 @@
+import argparse
 import asyncio
+import logging
 from core.environment import Environment
 from core.simulation import SimulationManager
 from core.interface import GridVisualizer
 
+try:
+    import uvloop
+except ImportError:  # optional, and not available on Windows
+    uvloop = None
 
-async def main():
+
+async def main(headless: bool = False, results_path: str = "simulation_results.csv"):
     try:
         # Initialize environment and visualization
         env = Environment(config_path="config.yaml")
-        visualizer = GridVisualizer(env.size)
+        visualizer = GridVisualizer(env.size, enabled=not headless)
 
         # Create and setup simulation manager
-        sim_manager = SimulationManager(env, visualizer)
+        sim_manager = SimulationManager(env, visualizer, results_path=results_path)
         await sim_manager.initialize_agents()
 
         # Run simulation
@@ -22,7 +29,25 @@ async def main():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Waste collection multi-agent simulation")
+    parser.add_argument("--headless", action="store_true", help="run without the pygame window")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="agent log verbosity; DEBUG shows per-tick and per-message activity")
+    parser.add_argument("--results", default="simulation_results.csv",
+                        help="statistics file; a .parquet path is a Parquet dataset directory, "
+                             "one file per run (requires pyarrow)")
+    args = parser.parse_args()
+
+    # Library loggers (SPADE, XMPP) stay at WARNING; the chosen level applies to this project only
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s: %(message)s")
+    for project_logger in ("core", "agents"):
+        logging.getLogger(project_logger).setLevel(args.log_level)
+
+    # Faster drop-in event loop when installed
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
     try:
-        asyncio.run(main())
+        asyncio.run(main(headless=args.headless, results_path=args.results))
     except KeyboardInterrupt:
         print("\nSimulation interrupted by user")
@@ -1,17 +1,139 @@
+import abc
 import asyncio
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+import atexit
+import logging
 import random
+import sys
 import time
 import os
 import csv
+import uuid
 from agents.truck_agent import TruckAgent
 from agents.bin_agent import BinAgent
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional, only needed for .parquet results
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+# Columns that repeat the run's configuration, dictionary-encoded in Parquet output
+CONFIG_COLUMNS = ['number_of_trucks', 'number_of_bins', 'bin_threshold', 'truck_waste_capacity',
+                  'truck_waste_threshold', 'truck_fuel_capacity', 'truck_fuel_threshold']
+
+# Count columns; every other statistic is stored as a float so all runs share one Parquet schema
+INTEGER_COLUMNS = {'number_of_trucks', 'number_of_bins', 'simulation_days', 'total_collections',
+                   'total_overflow_incidents', 'total_traffic_events', 'total_malfunctions',
+                   'total_refuel_count', 'total_depot_returns'}
+
+
+class _ResultsSink(abc.ABC):
+    """Results destination shared by the runs of one process, one instance per path"""
+    _instances: Dict[Tuple[type, str], "_ResultsSink"] = {}
+
+    def __init__(self, path: str):
+        self.path = path
+        atexit.register(self.close)
+
+    @classmethod
+    def instance(cls, path: str) -> "_ResultsSink":
+        """Get the shared sink for a results path, opening it on first use"""
+        sink = cls._instances.get((cls, path))
+        if sink is None:
+            sink = cls._instances[(cls, path)] = cls(path)
+        return sink
+
+    @abc.abstractmethod
+    def append(self, stats: Dict):
+        """Record the statistics of one run"""
+
+    def flush(self):
+        """Make every appended run durable; nothing to do for sinks that finish each run in append"""
+
+    def close(self):
+        """Release the sink; the next instance() call opens a new one"""
+        self._instances.pop((type(self), self.path), None)
+
+
+class _CSVSink(_ResultsSink):
+    """Results file kept open across runs so parameter sweeps only pay the setup once"""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._header_written = os.path.isfile(path) and os.path.getsize(path) > 0
+        self._file = open(path, mode='a', newline='', encoding='utf-8')
+        self._writer: Optional[csv.DictWriter] = None
+
+    def append(self, stats: Dict):
+        """Write one row of statistics, preceded by the header for a new file"""
+        if self._writer is None:
+            self._writer = csv.DictWriter(self._file, fieldnames=stats.keys())
+        if not self._header_written:
+            self._writer.writeheader()
+            self._header_written = True
+        self._writer.writerow(stats)
+
+    def flush(self):
+        """Push buffered rows to disk"""
+        if not self._file.closed:
+            self._file.flush()
+
+    def close(self):
+        """Flush and close the file; the next instance() call reopens it"""
+        if not self._file.closed:
+            self._file.close()
+        super().close()
+
+
+class _ParquetDatasetSink(_ResultsSink):
+    """Parquet dataset directory holding one file per run, read back as a single table"""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        os.makedirs(path, exist_ok=True)
+
+    def append(self, stats: Dict):
+        """Write one run as its own complete Parquet file"""
+        schema = pa.schema([(name, pa.int64() if name in INTEGER_COLUMNS else pa.float64()) for name in stats])
+        table = pa.Table.from_pylist([stats], schema=schema)
+
+        # Written under a hidden name (skipped by dataset readers) and renamed once complete,
+        # so a crash never leaves a partial file and never touches earlier runs
+        name = f"run-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+        tmp_path = os.path.join(self.path, "." + name)
+        pq.write_table(table, tmp_path, use_dictionary=CONFIG_COLUMNS)
+        os.replace(tmp_path, os.path.join(self.path, name))
+
+
+def results_sink(path: str) -> _ResultsSink:
+    """Pick the results sink by extension: a .parquet path is a dataset directory, anything else CSV"""
+    if path.endswith(".parquet"):
+        if pq is not None:
+            return _ParquetDatasetSink.instance(path)
+        path = path[:-len(".parquet")] + ".csv"
+        logger.warning("pyarrow is not installed, writing results to %s instead", path)
+    return _CSVSink.instance(path)
+
 
 class SimulationManager:
-    def __init__(self, env, visualizer=None):
+    def __init__(self, env, visualizer=None, results_path: str = "simulation_results.csv"):
         self.env = env
         self.visualizer = visualizer
+        self.results_path = results_path
+        self._results: Optional[_ResultsSink] = None
+
+        # Resolve the display hook once; headless runs get a no-op
+        if visualizer is not None and visualizer.enabled:
+            self._update_display = visualizer.update_display
+            self._frame_interval = visualizer.render_interval
+        else:
+            self._update_display = lambda *args, **kwargs: None
+            self._frame_interval = 0.0
+        self._next_frame = 0.0
+
         self.trucks: List[TruckAgent] = []
         self.bins: List[BinAgent] = []
         self.start_time = None
@@ -33,38 +155,65 @@ class SimulationManager:
         num_trucks = self.env.config['agents']['counts']['trucks']
         min_distance = self.env.config['agents']['bin']['min_distance']
 
+        # Cells a new bin may not use: the depot, fuel stations and anything
+        # closer than min_distance (Chebyshev) to an already placed bin
+        size = self.env.size
+        forbidden = {self.env.depot["position"]} | {station["position"] for station in self.env.fuel_stations}
+
         # Initialize bins
         for i in range(num_bins):
-            while True:
-                pos = (random.randint(0, self.env.size - 1), random.randint(0, self.env.size - 1))
-                if pos != self.env.depot["position"] and pos not in [station["position"] for station in
-                                                                     self.env.fuel_stations]:
-                    if not self.bins or all(
-                            max(abs(pos[0] - b.position[0]), abs(pos[1] - b.position[1])) >= min_distance
-                            for b in self.bins
-                    ):
-                        break
+            # Rejection sampling, bounded so a crowded grid cannot livelock
+            for _ in range(size * size):
+                pos = (random.randint(0, size - 1), random.randint(0, size - 1))
+                if pos not in forbidden:
+                    break
+            else:
+                # Crowded grid: draw directly from the remaining free cells
+                free_cells = [(x, y) for x in range(size) for y in range(size) if (x, y) not in forbidden]
+                if not free_cells:
+                    raise ValueError(f"Cannot place {num_bins} bins {min_distance} cells apart "
+                                     f"on a {size}x{size} grid")
+                pos = random.choice(free_cells)
+
+            for x in range(max(0, pos[0] - min_distance + 1), min(size, pos[0] + min_distance)):
+                for y in range(max(0, pos[1] - min_distance + 1), min(size, pos[1] + min_distance)):
+                    forbidden.add((x, y))
 
             bin_agent = BinAgent(f"bin{i + 1}@localhost", "password", self.env, position=pos)
-            await bin_agent.start()
             self.bins.append(bin_agent)
 
         # Initialize trucks
         for i in range(num_trucks):
             truck_agent = TruckAgent(f"truck{i + 1}@localhost", "password", self.env)
-            await truck_agent.start()
             self.trucks.append(truck_agent)
 
         random.seed()
+
+        # Bins come online before trucks, as they did when started one by one
+        await self._start_agents(self.bins)
+        await self._start_agents(self.trucks)
         return self.trucks, self.bins
 
+    async def _start_agents(self, agents, max_concurrent: int = 16):
+        """Start agents concurrently, capping the number of simultaneous XMPP logins"""
+        semaphore = asyncio.Semaphore(max_concurrent)
+
+        async def start(agent):
+            async with semaphore:
+                await agent.start()
+
+        await asyncio.gather(*(start(agent) for agent in agents))
+
     async def run_simulation_step(self, current_hour):
         """Run a single step of the simulation"""
         self.env.step_time()
         time_of_day = self.env.current_time
 
-        if self.visualizer:
-            self.visualizer.update_display(self.env, self.trucks, self.bins)
+        # Redraw at most once per frame interval, however fast the steps run
+        now = time.monotonic()
+        if now >= self._next_frame:
+            self._update_display(self.env, self.trucks, self.bins)
+            self._next_frame = now + self._frame_interval
 
         # Update status display
         current_day = (current_hour // 24) + 1
@@ -72,10 +221,29 @@ class SimulationManager:
         status = "🌙\n" if (20 <= time_of_day or time_of_day <= 6) else ""
         status += " ⚠️\n" if (7 <= time_of_day <= 9) or (17 <= time_of_day <= 19) else ""
 
-        print(f"\rDay {current_day}/7 - Time: {formatted_time} {status}", end="", flush=True)
+        sys.stdout.write(f"\rDay {current_day}/7 - Time: {formatted_time} {status}")
+        sys.stdout.flush()
 
     def collect_statistics(self) -> Dict:
         """Collect essential simulation statistics including malfunctions and configuration"""
+        # Sum all per-agent counters in one pass over each agent list
+        collections = distance = fuel_used = malfunctions = refuels = depot_returns = 0
+        for truck in self.trucks:
+            if truck.is_alive():
+                collections += truck.total_collections
+                distance += truck.total_distance
+                fuel_used += truck.total_fuel_used
+                malfunctions += truck.malfunction_count
+                refuels += truck.refuel_count
+                depot_returns += truck.depot_returns
+
+        waste_generated = overflow_incidents = mission_costs = 0
+        for bin_agent in self.bins:
+            if bin_agent.is_alive():
+                waste_generated += bin_agent.total_waste_generated
+                overflow_incidents += bin_agent.overflow_incidents
+                mission_costs += bin_agent.total_mission_costs
+
         stats = {
             # Configuration parameters
             'number_of_trucks': self.env.config['agents']['counts']['trucks'],
@@ -87,23 +255,23 @@ class SimulationManager:
             'truck_fuel_threshold': self.env.config['agents']['truck']['fuel']['threshold'],
 
             # Runtime statistics
-            'simulation_time': time.time() - self.start_time,
+            'simulation_time': time.monotonic() - self.start_time,
             'simulation_days': self.simulation_days,
-            'total_collections': sum(t.total_collections for t in self.trucks if t.is_alive()),
-            'total_distance': sum(t.total_distance for t in self.trucks if t.is_alive()),
-            'total_fuel_used': sum(t.total_fuel_used for t in self.trucks if t.is_alive()),
-            'total_waste_generated': sum(b.total_waste_generated for b in self.bins if b.is_alive()),
-            'total_overflow_incidents': sum(b.overflow_incidents for b in self.bins if b.is_alive()),
+            'total_collections': collections,
+            'total_distance': distance,
+            'total_fuel_used': fuel_used,
+            'total_waste_generated': waste_generated,
+            'total_overflow_incidents': overflow_incidents,
             'total_traffic_events': self.env.get_event_statistics()['total_events'],
-            'total_malfunctions': sum(t.malfunction_count for t in self.trucks if t.is_alive()),
-            'total_refuel_count': sum(t.refuel_count for t in self.trucks if t.is_alive()),
-            'total_depot_returns': sum(t.depot_returns for t in self.trucks if t.is_alive()),
-            'total_mission_costs': sum(b.total_mission_costs for b in self.bins if b.is_alive())
+            'total_malfunctions': malfunctions,
+            'total_refuel_count': refuels,
+            'total_depot_returns': depot_returns,
+            'total_mission_costs': mission_costs
         }
         return stats
 
     async def save_statistics(self):
-        """Save statistics to CSV and print summary"""
+        """Save statistics to the results file and print summary"""
         stats = self.collect_statistics()
 
         # Print summary
@@ -129,28 +297,29 @@ class SimulationManager:
         print(f"Total refueling stops: {stats['total_refuel_count']}")
         print(f"Total depot returns: {stats['total_depot_returns']}")
 
-        # Save to CSV
-        csv_filename = "simulation_results.csv"
-        file_exists = os.path.isfile(csv_filename)
-
-        with open(csv_filename, mode='a', newline='', encoding='utf-8') as file:
-            writer = csv.DictWriter(file, fieldnames=stats.keys())
-            if not file_exists:
-                writer.writeheader()
-            writer.writerow(stats)
+        # Save to the results file (CSV, or Parquet for a .parquet path)
+        self._results = results_sink(self.results_path)
+        self._results.append(stats)
 
     async def cleanup(self):
         """Clean up simulation resources"""
         if self.visualizer:
             self.visualizer.close()
 
-        for agent in self.trucks + self.bins:
-            if agent.is_alive():
-                await agent.stop()
+        # Keep the results sink open for further runs, but make this run's statistics durable
+        if self._results is not None:
+            self._results.flush()
+
+        # Stop all agents concurrently; one failing stop() must not cancel the others or abort the shutdown
+        running = [agent for agent in self.trucks + self.bins if agent.is_alive()]
+        results = await asyncio.gather(*(agent.stop() for agent in running), return_exceptions=True)
+        for agent, result in zip(running, results):
+            if isinstance(result, Exception):
+                logger.error("Error stopping agent %s: %s", agent.jid, result)
 
     async def run(self):
         """Run the complete simulation"""
-        self.start_time = time.time()
+        self.start_time = time.monotonic()
         seconds_per_hour = self.env.config['time']['real_seconds_per_hour']
 
         print("\nSimulation started!")
@@ -158,14 +327,15 @@ class SimulationManager:
         print(f"Depot position: {self.env.depot['position']}")
 
         try:
+            # Absolute schedule, so time spent in each step does not accumulate as drift
+            deadline = time.monotonic()
             for current_hour in range(self.simulation_hours):
-                cycle_start = time.time()
+                deadline += seconds_per_hour
 
                 await self.run_simulation_step(current_hour)
 
                 # Maintain correct timescale
-                elapsed = time.time() - cycle_start
-                await asyncio.sleep(max(0, seconds_per_hour - elapsed))
+                await asyncio.sleep(max(0, deadline - time.monotonic()))
 
         except KeyboardInterrupt:
             print("\n\nSimulation stopped by user")
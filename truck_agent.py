@@ -1,23 +1,37 @@
-from spade.agent import Agent
-from spade.behaviour import CyclicBehaviour
-from spade.message import Message
-from spade.template import Template
-import json
+from spade.behaviour import CyclicBehaviour, PeriodicBehaviour
 import asyncio
+import logging
+import math
 import random
-from typing import Tuple, Any
-import yaml
-
-
-class TruckAgent(Agent):
-    def __init__(self, jid: str, password: str, environment: Any, config_path: str = "config.yaml"):
-        super().__init__(jid, password)
-        self.env = environment
+import time
+from dataclasses import dataclass
+from typing import Tuple, Any, Dict, Optional
+from agents.bus_agent import BusAgent
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class MissionPlan:
+    """Legs and cost of a collection mission, with the truck state and hour it was planned from"""
+    start: Tuple[int, int]
+    fuel_level: float
+    current_waste: float
+    waste_level: float
+    hour: int  # absolute hour; traffic multipliers and events only change when it advances
+    dist_to_bin: float
+    dist_to_depot: float = 0.0
+    needs_depot: bool = False
+    needs_refuel: bool = False
+    cost: float = float('inf')
+
+
+class TruckAgent(BusAgent):
+    def __init__(self, jid: str, password: str, environment: Any, config_path: Optional[str] = None):
+        super().__init__(jid, password, environment)
         self.position = environment.depot["position"]
 
-        # Load configuration
-        with open(config_path, 'r') as f:
-            config = yaml.safe_load(f)
+        config = environment.agent_config(config_path)
         self.config = config['agents']['truck']
 
         # Initialize parameters from config
@@ -26,12 +40,18 @@ class TruckAgent(Agent):
         self.fuel_consumption = self.config['fuel']['consumption']
         self.fuel_threshold = self.config['fuel']['capacity'] * self.config['fuel']['threshold']
         self.waste_capacity = self.config['waste']['capacity']
+        self.waste_return_threshold = self.waste_capacity * self.config['waste']['threshold']
+        self.inv_waste_capacity = 1.0 / self.waste_capacity
         self.current_waste = 0
         self.busy = False
         self.current_bin = None
         self.malfunction_probability = self.config['malfunction']['probability']
         self.malfunction_min_duration = self.config['malfunction']['duration']['min']
         self.malfunction_max_duration = self.config['malfunction']['duration']['max']
+        self.malfunction_log_q = (math.log1p(-self.malfunction_probability)
+                                  if 0 < self.malfunction_probability < 1 else None)
+        # Drawn on the first check, not here: agents are built while the placement seed is active
+        self.checks_until_malfunction: Optional[float] = None
 
         # Statistics
         self.total_collections = 0
@@ -41,13 +61,116 @@ class TruckAgent(Agent):
         self.depot_returns = 0
         self.total_waste_collected = 0
         self.busy_time = 0
-        self.service_start_time = None
-        self.service_start_day = None
+        self.service_start_abs = None  # absolute hour, see Environment.get_absolute_hour
         self.malfunctioned = False
-        self.malfunction_end_time = None
-        self.malfunction_end_day = None
+        self.malfunction_end_abs = None  # absolute hour
         self.malfunction_count = 0
 
+        # Bids awaiting an answer: bin JID -> monotonic deadline. Bins only notify the winning
+        # truck, so a bid with no acceptance by its deadline was rejected. The deadline follows
+        # the bins' proposal window, plus a second for an acceptance still in flight
+        self.bid_timeout = config['agents']['bin']['proposal_timeout'] + 1
+        self.outstanding_bids: Dict[str, float] = {}
+        self.mission_plans: Dict[str, MissionPlan] = {}  # plan behind each outstanding bid
+
+        # Messages from the bus mailbox are routed into one inbox per performative
+        self.inboxes: Dict[str, asyncio.Queue] = {
+            "cfp": asyncio.Queue(),
+            "accept-proposal": asyncio.Queue()
+        }
+
+        # Envelopes whose content never changes, built once and shared by every send
+        self.refusals = {
+            reason: ("refuse", self.jid_str, reason)
+            for reason in ("MALFUNCTIONED", "BUSY", "FULL", "NO_FUEL")
+        }
+        self.status_informs = {
+            status: ("inform", self.jid_str, {"status": status})
+            for status in ("COLLECTION_COMPLETE", "COLLECTION_FAILED")
+        }
+
+    def record_bid(self, bin_jid: str, plan: MissionPlan):
+        """Remember a proposal sent to a bin, and the plan behind it, until its answer deadline"""
+        self.outstanding_bids[bin_jid] = time.monotonic() + self.bid_timeout
+        self.mission_plans[bin_jid] = plan
+
+    def expire_bids(self):
+        """Drop bids whose deadline passed without an acceptance"""
+        now = time.monotonic()
+        for bin_jid, deadline in list(self.outstanding_bids.items()):
+            if now >= deadline:
+                del self.outstanding_bids[bin_jid]
+                self.mission_plans.pop(bin_jid, None)
+                logger.debug("Truck %s got no answer from %s, assuming proposal rejected", self.jid, bin_jid)
+
+    def claim_bid(self, bin_jid: str) -> bool:
+        """Commit to an accepted bid if it is still open and the truck is free to serve it.
+
+        A truck serves one bin at a time: once a bid is claimed the other open bids are
+        dropped, so their acceptances are declined and those bins re-tender straight away
+        instead of queueing behind this mission.
+        """
+        deadline = self.outstanding_bids.pop(bin_jid, None)
+        if (self.malfunctioned or self.current_bin is not None
+                or deadline is None or time.monotonic() > deadline):
+            self.mission_plans.pop(bin_jid, None)
+            return False
+
+        self.current_bin = bin_jid
+        for other in self.outstanding_bids:
+            self.mission_plans.pop(other, None)
+        self.outstanding_bids.clear()
+        return True
+
+    def report_malfunction(self, to: str):
+        """Tell a bin its collection is off because the truck is under repair"""
+        self.send_message(to, "inform", {
+            "status": "TRUCK_MALFUNCTION",
+            "repair_time": self.malfunction_end_abs - self.env.get_absolute_hour()
+        })
+
+    def _plan_mission(self, bin_pos: Tuple[int, int], waste_level: float) -> MissionPlan:
+        """Plan a collection mission from the current position; cost is inf if the fuel cannot cover it"""
+        env = self.env
+        fuel_level = self.fuel_level
+        fuel_cons = self.fuel_consumption
+
+        dist_to_bin = env.get_travel_cost(self.position, bin_pos)
+        plan = MissionPlan(self.position, fuel_level, self.current_waste, waste_level,
+                           env.get_absolute_hour(), dist_to_bin)
+
+        # Unreachable bin: no need to price the depot leg
+        if dist_to_bin * fuel_cons > fuel_level:
+            plan.needs_refuel = True
+            return plan
+
+        # Check if depot visit will be needed
+        total_distance = dist_to_bin
+        if self.current_waste + waste_level >= self.waste_return_threshold:
+            plan.needs_depot = True
+            plan.dist_to_depot = env.get_travel_cost(bin_pos, env.depot["position"])
+            total_distance += plan.dist_to_depot
+
+            # Check fuel requirements for the full round
+            if total_distance * fuel_cons > fuel_level:
+                plan.needs_refuel = True
+                return plan
+
+        plan.needs_refuel = fuel_level <= self.fuel_threshold
+
+        # Calculate final cost with waste penalty
+        plan.cost = total_distance * (1 + self.current_waste * self.inv_waste_capacity)
+        return plan
+
+    def mission_plan_for(self, bin_jid: str, bin_pos: Tuple[int, int], waste_level: float) -> MissionPlan:
+        """Reuse the plan behind the bid to a bin, re-planning if the truck's state or the hour changed since"""
+        plan = self.mission_plans.pop(bin_jid, None)
+        if (plan is None or plan.hour != self.env.get_absolute_hour() or plan.start != self.position
+                or plan.fuel_level != self.fuel_level or plan.current_waste != self.current_waste
+                or plan.waste_level != waste_level):
+            plan = self._plan_mission(bin_pos, waste_level)
+        return plan
+
     def find_nearest_fuel_station(self, current_pos: Tuple[int, int]) -> Tuple[Tuple[int, int], float]:
         """Find the nearest fuel station and return its position and distance"""
         nearest_station = None
@@ -77,150 +200,128 @@ class TruckAgent(Agent):
         """Record service start time"""
         if not self.busy:
             self.busy = True
-            self.service_start_time = self.env.current_time
-            self.service_start_day = self.env.current_day
-            print(f"Truck {self.jid} started service at day {self.service_start_day}, time {self.service_start_time}")
+            self.service_start_abs = self.env.get_absolute_hour()
+            logger.debug("Truck %s started service at day %s, time %s",
+                         self.jid, self.env.current_day, self.env.current_time)
 
     def end_service(self):
         """Record service end time"""
-        if self.service_start_time is not None:
-            current_time = self.env.current_time
-            current_day = self.env.current_day
-
-            # Calculate total hours including days passed
-            hours_from_days = (current_day - self.service_start_day) * 24
-            if current_time < self.service_start_time:
-                elapsed_time = (24 - self.service_start_time) + current_time
-            else:
-                elapsed_time = current_time - self.service_start_time
-
-            total_elapsed = hours_from_days + elapsed_time
+        if self.service_start_abs is not None:
+            total_elapsed = self.env.get_absolute_hour() - self.service_start_abs
             self.busy_time += total_elapsed
-            print(f"Truck {self.jid} ended service: +{total_elapsed:.2f} hours (Total: {self.busy_time:.2f})")
+            logger.debug("Truck %s ended service: +%.2f hours (Total: %.2f)",
+                         self.jid, total_elapsed, self.busy_time)
 
-            self.service_start_time = None
-            self.service_start_day = None
+            self.service_start_abs = None
         self.busy = False
 
+    def draw_checks_until_malfunction(self) -> float:
+        """Draw how many malfunction checks pass before the next one fails (geometric)"""
+        if self.malfunction_probability <= 0:
+            return float('inf')
+        if self.malfunction_probability >= 1:
+            return 0
+        # Inverse transform: P(count >= k) = (1 - p) ** k, same as one Bernoulli draw per check
+        return int(math.log(1.0 - random.random()) / self.malfunction_log_q)
+
     async def check_malfunction(self) -> bool:
         """Check if truck malfunctions"""
-        if not self.malfunctioned and random.random() < self.malfunction_probability:
-            self.malfunction_count += 1
-            self.malfunctioned = True
-
-            repair_duration = random.uniform(
-                self.malfunction_min_duration,
-                self.malfunction_max_duration
-            )
-
-            # Store both day and time for repair end
-            self.malfunction_end_day = self.env.current_day
-            self.malfunction_end_time = self.env.current_time + repair_duration
-
-            # Handle day wrap-around
-            if self.malfunction_end_time >= 24:
-                self.malfunction_end_day += self.malfunction_end_time // 24
-                self.malfunction_end_time = self.malfunction_end_time % 24
-
-            self.position = self.env.depot["position"]
-            print(f"Truck {self.jid} has malfunctioned and returned to depot!")
-            print(f"Expected repair time: {repair_duration:.2f} hours")
-            print(f"Will be repaired on day {self.malfunction_end_day} at time {self.malfunction_end_time:.2f}")
-            return True
-        return False
+        if self.malfunctioned:
+            return False
+        if self.checks_until_malfunction is None:
+            self.checks_until_malfunction = self.draw_checks_until_malfunction()
+        if self.checks_until_malfunction > 0:
+            self.checks_until_malfunction -= 1
+            return False
+
+        self.checks_until_malfunction = self.draw_checks_until_malfunction()
+        self.malfunction_count += 1
+        self.malfunctioned = True
+
+        repair_duration = random.uniform(
+            self.malfunction_min_duration,
+            self.malfunction_max_duration
+        )
+
+        self.malfunction_end_abs = self.env.get_absolute_hour() + repair_duration
+
+        self.position = self.env.depot["position"]
+        logger.info("Truck %s has malfunctioned and returned to depot! Expected repair time: %.2f hours "
+                    "(repaired on day %d at time %.2f)", self.jid, repair_duration,
+                    int(self.malfunction_end_abs // 24) + 1, self.malfunction_end_abs % 24)
+        return True
 
     async def update_malfunction_status(self) -> bool:
         """Check if repair period is over"""
-        if self.malfunctioned and self.malfunction_end_time is not None:
-            current_time = self.env.current_time
-            current_day = self.env.current_day
+        if self.malfunctioned and self.malfunction_end_abs is not None:
+            total_remaining = self.malfunction_end_abs - self.env.get_absolute_hour()
 
             # Check if we've reached or passed the repair end time
-            if (current_day > self.malfunction_end_day or
-                    (current_day == self.malfunction_end_day and
-                     current_time >= self.malfunction_end_time)):
+            if total_remaining <= 0:
                 self.malfunctioned = False
-                self.malfunction_end_time = None
-                self.malfunction_end_day = None
-                self.service_start_time = None
-                print(f"🔧 Truck {self.jid} has been repaired and is ready for new tasks!")
+                self.malfunction_end_abs = None
+                self.service_start_abs = None
+                logger.info("🔧 Truck %s has been repaired and is ready for new tasks!", self.jid)
                 return True
             else:
-                # Calculate remaining time including days
-                remaining_days = self.malfunction_end_day - current_day
-                remaining_hours = self.malfunction_end_time - current_time
-                if remaining_hours < 0:
-                    remaining_days -= 1
-                    remaining_hours = 24 + remaining_hours
-
-                total_remaining = remaining_days * 24 + remaining_hours
-                print(f"⚠️ Truck {self.jid} still under repair. {total_remaining:.2f} hours remaining")
+                logger.debug("⚠️ Truck %s still under repair. %.2f hours remaining", self.jid, total_remaining)
         return False
 
     class HandleCFP(CyclicBehaviour):
         async def run(self):
             """Main run loop for handling Call for Proposals"""
-            # Update truck status first
-            await self.agent.update_malfunction_status()
-
             # Wait for incoming message
-            msg = await self.receive(timeout=10)
-            if not msg:
-                return
-
-            sender = str(msg.sender)
+            sender, bin_data = await self.agent.inboxes["cfp"].get()
+            self.agent.expire_bids()
 
             # Check truck availability
             if not await self._check_truck_availability(sender):
                 return
 
             # Process the CFP
-            await self._process_cfp(msg, sender)
+            await self._process_cfp(bin_data, sender)
 
         async def _check_truck_availability(self, sender: str):
             """Check if truck is available for new tasks"""
             # Check for malfunction
             if self.agent.malfunctioned:
-                remaining_repair = self.agent.malfunction_end_time - self.agent.env.current_time
-                print(f"🚫 Truck {self.agent.jid} is under repair at depot for {remaining_repair:.2f} more hours, "
-                      f"refusing request from {sender}")
+                remaining_repair = self.agent.malfunction_end_abs - self.agent.env.get_absolute_hour()
+                logger.debug("🚫 Truck %s is under repair at depot for %.2f more hours, refusing request from %s",
+                             self.agent.jid, remaining_repair, sender)
                 await self.send_refusal(sender, "MALFUNCTIONED")
                 return False
 
-            # Check if busy
-            if self.agent.busy:
-                print(f"Truck {self.agent.jid} is busy with {self.agent.current_bin}, "
-                      f"refusing request from {sender}")
+            # Check if busy, or committed to a bin whose mission has not started yet
+            if self.agent.busy or self.agent.current_bin is not None:
+                logger.debug("Truck %s is busy with %s, refusing request from %s",
+                             self.agent.jid, self.agent.current_bin, sender)
                 await self.send_refusal(sender, "BUSY")
                 return False
 
             return True
 
-        async def _process_cfp(self, msg: Message, sender: str):
+        async def _process_cfp(self, data: Dict[str, Any], sender: str):
             """Process the Call for Proposal message"""
-            print(f"Truck {self.agent.jid} received CFP from {sender}")
+            logger.debug("Truck %s received CFP from %s", self.agent.jid, sender)
 
+            # Parse message data; a malformed CFP is dropped, anything else is a bug and propagates
             try:
-                # Parse message data
-                bin_data = self._parse_bin_data(msg.body)
-                if not bin_data:
-                    return
-
-                if not await self._check_waste_capacity(bin_data['waste_level'], sender):
-                    return
+                bin_data = self._parse_bin_data(data)
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                logger.error("Truck %s received malformed CFP from %s: %s", self.agent.jid, sender, e)
+                return
 
-                # Calculate mission cost
-                total_cost = await self.calculate_mission_cost(bin_data['position'], bin_data['waste_level'])
+            if not await self._check_waste_capacity(bin_data['waste_level'], sender):
+                return
 
-                # Handle response
-                await self._handle_cost_response(total_cost, sender)
+            # Plan the mission; the plan is kept with the bid and reused if this bin accepts
+            plan = self.agent._plan_mission(bin_data['position'], bin_data['waste_level'])
 
-            except Exception as e:
-                print(f"Truck {self.agent.jid} error processing CFP: {str(e)}")
+            # Handle response
+            await self._handle_cost_response(plan, sender)
 
-        def _parse_bin_data(self, msg_body: str):
-            """Parse bin data from message body"""
-            data = json.loads(msg_body)
+        def _parse_bin_data(self, data: Dict[str, Any]):
+            """Parse bin data from message payload"""
             return {
                 'position': (int(data["position"][0]), int(data["position"][1])),
                 'waste_level': data["level"]
@@ -229,259 +330,202 @@ class TruckAgent(Agent):
         async def _check_waste_capacity(self, waste_level: float, sender: str):
             """Check if truck has enough waste capacity"""
             if self.agent.current_waste + waste_level > self.agent.waste_capacity:
-                print(f"Truck {self.agent.jid} cannot accept job - waste capacity full")
+                logger.debug("Truck %s cannot accept job - waste capacity full", self.agent.jid)
                 await self.send_refusal(sender, "FULL")
                 return False
             return True
 
-        async def _handle_cost_response(self, total_cost: float, sender: str):
+        async def _handle_cost_response(self, plan: MissionPlan, sender: str):
             """Handle the cost calculation response"""
-            if total_cost == float('inf'):
-                print(f"Truck {self.agent.jid} cannot reach bin - insufficient fuel")
+            if plan.cost == float('inf'):
+                logger.debug("Truck %s cannot reach bin - insufficient fuel", self.agent.jid)
                 await self.send_refusal(sender, "NO_FUEL")
                 return
 
             # Send proposal
-            reply = Message(to=sender)
-            reply.set_metadata("performative", "propose")
-            reply.body = str(total_cost)
-            await self.send(reply)
-            print(f"Truck {self.agent.jid} sent proposal with cost {total_cost:.2f}")
+            self.agent.send_message(sender, "propose", plan.cost)
+            self.agent.record_bid(sender, plan)
+            logger.debug("Truck %s sent proposal with cost %.2f", self.agent.jid, plan.cost)
 
         async def send_refusal(self, to: str, reason: str):
             """Send a refusal message"""
-            refuse_msg = Message(to=to)
-            refuse_msg.set_metadata("performative", "refuse")
-            refuse_msg.body = reason
-            await self.send(refuse_msg)
-
-        async def calculate_mission_cost(self, bin_pos: Tuple[int, int], waste_level: float):
-            """Calculate the total cost of the mission"""
-            try:
-                # Get relevant positions
-                current_pos = self.agent.position
-                depot_pos = self.agent.env.depot["position"]
-
-                # Calculate base distance to bin
-                dist_to_bin = self.agent.env.get_travel_cost(current_pos, bin_pos)
-                total_distance = dist_to_bin
-
-                # Check if depot visit will be needed
-                waste_after_collection = self.agent.current_waste + waste_level
-                waste_threshold = self.agent.waste_capacity * self.agent.config['waste']['threshold']
-                if waste_after_collection >= waste_threshold:
-                    dist_to_depot = self.agent.env.get_travel_cost(bin_pos, depot_pos)
-                    total_distance += dist_to_depot
-
-                # Check fuel requirements
-                fuel_needed = total_distance * self.agent.fuel_consumption
-                if fuel_needed > self.agent.fuel_level:
-                    return float('inf')
-
-                # Calculate final cost with waste penalty
-                waste_factor = 1 + (self.agent.current_waste / self.agent.waste_capacity)
-                return total_distance * waste_factor
-
-            except Exception as e:
-                print(f"Error calculating mission cost: {e}")
-                return float('inf')
+            self.agent.env.post(to, self.agent.refusals[reason])
 
     class HandleAcceptance(CyclicBehaviour):
         async def run(self):
-            msg = await self.receive(timeout=10)
-            if not msg:
-                return
-
-            sender = str(msg.sender)
+            sender, data = await self.agent.inboxes["accept-proposal"].get()
 
-            print(f"Truck {self.agent.jid} proposal was accepted by {sender}")
-            self.agent.busy = True
-            self.agent.current_bin = sender
+            logger.info("Truck %s proposal was accepted by %s", self.agent.jid, sender)
 
             try:
-                data = json.loads(msg.body)
                 bin_pos = (int(data["position"][0]), int(data["position"][1]))
                 waste_level = data["level"]
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                logger.error("Truck %s received malformed acceptance from %s: %s", self.agent.jid, sender, e)
+                # Inform bin of failure
+                self.agent.env.post(sender, self.agent.status_informs["COLLECTION_FAILED"])
+                self.agent.current_bin = None
+                return
 
-                await self.execute_collection_mission(bin_pos, waste_level, sender)
+            # A malfunction can strike between the claim and the mission start
+            if self.agent.malfunctioned:
+                self.agent.report_malfunction(sender)
+                self.agent.current_bin = None
+                return
 
-            except Exception as e:
-                print(f"Truck {self.agent.jid} error during collection: {str(e)}")
-                # Inform bin of failure
-                inform_msg = Message(to=sender)
-                inform_msg.set_metadata("performative", "inform")
-                inform_msg.body = "COLLECTION_FAILED"
-                await self.send(inform_msg)
+            self.agent.busy = True
+            try:
+                await self.execute_collection_mission(bin_pos, waste_level, sender)
+            except Exception:
+                # Already logged and reported to the bin by execute_collection_mission
+                pass
             finally:
                 self.agent.busy = False
                 self.agent.current_bin = None
 
         async def execute_collection_mission(self, bin_pos: Tuple[int, int], waste_level: float, sender: str):
             """Execute complete collection mission"""
+            agent = self.agent
+            env = agent.env
+
             try:
-                print(f"Truck {self.agent.jid} starting collection mission for {sender}")
-                self.agent.start_service()
-                initial_position = self.agent.position
+                logger.debug("Truck %s starting collection mission for %s", agent.jid, sender)
+                agent.start_service()
+                initial_position = agent.position
 
                 # Check for malfunction before starting travel
-                if await self.agent.check_malfunction():
-                    inform_msg = Message(to=sender)
-                    inform_msg.set_metadata("performative", "inform")
-                    inform_msg.body = json.dumps({
-                        "status": "TRUCK_MALFUNCTION",
-                        "repair_time": self.agent.malfunction_end_time - self.agent.env.current_time
-                    })
-                    await self.send(inform_msg)
+                # (the bin is informed once, by the handler below)
+                if await agent.check_malfunction():
                     raise Exception(f"Truck malfunction - returned to depot for repairs")
 
-                # Check if refueling needed
-                total_distance = self.agent.env.get_travel_cost(self.agent.position, bin_pos)
-
-                if self.agent.current_waste + waste_level >= self.agent.waste_capacity * self.agent.config['waste'][
-                    'threshold']:
-                    total_distance += self.agent.env.get_travel_cost(bin_pos, self.agent.env.depot["position"])
-
-                if (total_distance * self.agent.fuel_consumption > self.agent.fuel_level or
-                        self.agent.fuel_level <= self.agent.fuel_threshold):
-                    print(f"Truck {self.agent.jid} needs refueling before collection")
+                # Check if refueling needed, reusing the plan made when bidding
+                plan = agent.mission_plan_for(sender, bin_pos, waste_level)
+                if plan.needs_refuel:
+                    logger.debug("Truck %s needs refueling before collection", agent.jid)
                     await self.refuel()
 
                 # Travel to bin
-                print(f"Truck {self.agent.jid} traveling to bin at {bin_pos}")
+                logger.debug("Truck %s traveling to bin at %s", agent.jid, bin_pos)
                 await self.travel_to(bin_pos)
 
                 # Collect waste
-                print(f"Truck {self.agent.jid} collecting waste: {waste_level:.2f} units")
+                logger.debug("Truck %s collecting waste: %.2f units", agent.jid, waste_level)
                 await asyncio.sleep(1)  # Collection time
-                self.agent.current_waste += waste_level
+                agent.current_waste += waste_level
 
                 # Record collection
-                self.agent.record_collection()
+                agent.record_collection()
 
-                print(
-                    f"Truck {self.agent.jid} collection complete. Capacity: {self.agent.current_waste:.2f}/{self.agent.waste_capacity}")
+                logger.info("Truck %s collection complete. Capacity: %.2f/%s",
+                            agent.jid, agent.current_waste, agent.waste_capacity)
 
                 # Inform bin of completion
-                inform_msg = Message(to=sender)
-                inform_msg.set_metadata("performative", "inform")
-                inform_msg.body = json.dumps({
-                    "status": "COLLECTION_COMPLETE"
-                })
-                await self.send(inform_msg)
-                print(f"Truck {self.agent.jid} informed bin of completion")
+                agent.env.post(sender, agent.status_informs["COLLECTION_COMPLETE"])
+                logger.debug("Truck %s informed bin of completion", agent.jid)
 
                 # Check if it needs to return to depot
-                if self.agent.current_waste >= self.agent.waste_capacity * self.agent.config['waste']['threshold']:
-                    print(
-                        f"Truck {self.agent.jid} waste threshold reached ({self.agent.current_waste:.2f}), returning to depot")
+                if agent.current_waste >= agent.waste_return_threshold:
+                    logger.info("Truck %s waste threshold reached (%.2f), returning to depot",
+                                agent.jid, agent.current_waste)
                     await self.return_to_depot()
                 else:
-                    print(f"Truck {self.agent.jid} waiting at current position for new requests")
+                    logger.debug("Truck %s waiting at current position for new requests", agent.jid)
 
                 # Update distance statistics
-                distance_covered = self.agent.env.calculate_distance(initial_position, self.agent.position)
-                self.agent.total_distance += distance_covered
+                distance_covered = env.calculate_distance(initial_position, agent.position)
+                agent.total_distance += distance_covered
 
-                print(f"Truck {self.agent.jid} mission completed")
+                logger.debug("Truck %s mission completed", agent.jid)
 
             except Exception as e:
-                print(f"Truck {self.agent.jid} error during collection: {str(e)}")
-                inform_msg = Message(to=sender)
-                inform_msg.set_metadata("performative", "inform")
-                if self.agent.malfunctioned:
-                    inform_msg.body = json.dumps({
-                        "status": "TRUCK_MALFUNCTION",
-                        "repair_time": self.agent.malfunction_end_time - self.agent.env.current_time
-                    })
+                logger.error("Truck %s error during collection: %s", agent.jid, e)
+                if agent.malfunctioned:
+                    agent.report_malfunction(sender)
                 else:
-                    inform_msg.body = json.dumps({
-                        "status": "COLLECTION_FAILED"
-                    })
-                await self.send(inform_msg)
+                    agent.env.post(sender, agent.status_informs["COLLECTION_FAILED"])
                 raise
 
             finally:
                 # Always end service and clear status
-                self.agent.end_service()
-                self.agent.busy = False
-                self.agent.current_bin = None
+                agent.end_service()
+                agent.busy = False
+                agent.current_bin = None
 
         async def travel_to(self, destination: Tuple[int, int]):
             """Travel to destination with fuel monitoring"""
-            distance = self.agent.env.get_travel_cost(self.agent.position, destination)
-            travel_time = distance / self.agent.speed
-            fuel_used = distance * self.agent.fuel_consumption
+            agent = self.agent
+            distance = agent.env.get_travel_cost(agent.position, destination)
+            travel_time = distance / agent.speed
+            fuel_used = distance * agent.fuel_consumption
 
-            if fuel_used > self.agent.fuel_level:
+            if fuel_used > agent.fuel_level:
                 raise Exception("Insufficient fuel for travel")
 
-            self.agent.fuel_level -= fuel_used
-            self.agent.total_fuel_used += fuel_used
+            agent.fuel_level -= fuel_used
+            agent.total_fuel_used += fuel_used
             await asyncio.sleep(travel_time)
-            self.agent.position = destination
+            agent.position = destination
 
-            print(f"Truck {self.agent.jid} arrived at {destination}")
+            logger.debug("Truck %s arrived at %s", agent.jid, destination)
 
         async def refuel(self):
             """Refuel at nearest station"""
             station_pos, _ = self.agent.find_nearest_fuel_station(self.agent.position)
-            print(f"Truck {self.agent.jid} heading to fuel station at {station_pos}")
+            logger.debug("Truck %s heading to fuel station at %s", self.agent.jid, station_pos)
             await self.travel_to(station_pos)
             await asyncio.sleep(1)
             old_fuel = self.agent.fuel_level
             fuel_added = self.agent.config['fuel']['capacity'] - old_fuel
             self.agent.fuel_level = self.agent.config['fuel']['capacity']
             self.agent.record_refuel(fuel_added)  # Record the refueling event
-            print(f"Truck {self.agent.jid} refueled: {old_fuel:.2f}L -> {self.agent.fuel_level:.2f}L")
+            logger.info("Truck %s refueled: %.2fL -> %.2fL", self.agent.jid, old_fuel, self.agent.fuel_level)
 
         async def return_to_depot(self):
             """Return to depot and empty waste"""
-            print(f"Truck {self.agent.jid} returning to depot with {self.agent.current_waste:.2f} waste")
+            logger.debug("Truck %s returning to depot with %.2f waste", self.agent.jid, self.agent.current_waste)
             await self.travel_to(self.agent.env.depot["position"])
             await asyncio.sleep(2)
             old_waste = self.agent.current_waste
             self.agent.current_waste = 0
             self.agent.depot_returns += 1  # Increment depot returns counter
-            print(
-                f"Truck {self.agent.jid} emptied {old_waste:.2f} waste at depot (Total returns: {self.agent.depot_returns})")
+            logger.info("Truck %s emptied %.2f waste at depot (Total returns: %s)",
+                        self.agent.jid, old_waste, self.agent.depot_returns)
 
-    class HandleRejection(CyclicBehaviour):
-        """New behavior to handle proposal rejections"""
+    class MalfunctionMonitor(PeriodicBehaviour):
+        """Check once per simulated hour whether a repair has finished"""
         async def run(self):
-            msg = await self.receive(timeout=10)
-            if not msg:
-                return
+            await self.agent.update_malfunction_status()
 
-            if msg.metadata.get("performative") == "reject-proposal":
-                sender = str(msg.sender)
-                try:
-                    data = json.loads(msg.body)
-                    print(f"Truck {self.agent.jid} proposal rejected by {sender}. Reason: {data.get('reason')}")
+    class DispatchMessages(CyclicBehaviour):
+        """Route bus messages to the inbox of the behaviour handling their performative"""
+        async def run(self):
+            performative, sender, payload = await self.agent.mailbox.get()
 
-                    # Clear any stored state about this proposal
-                    if self.agent.current_bin == sender:
-                        self.agent.current_bin = None
+            # Acceptances are claimed on arrival, not when a running mission lets HandleAcceptance
+            # get to them; one the truck cannot serve now is declined so the bin re-tenders
+            if performative == "accept-proposal" and not self.agent.claim_bid(sender):
+                if self.agent.malfunctioned:
+                    logger.info("Truck %s declining acceptance from %s, under repair", self.agent.jid, sender)
+                    self.agent.report_malfunction(sender)
+                else:
+                    logger.info("Truck %s declining acceptance from %s, bid no longer open", self.agent.jid, sender)
+                    self.agent.env.post(sender, self.agent.status_informs["COLLECTION_FAILED"])
+                return
 
-                except Exception as e:
-                    print(f"Error processing rejection from {sender}: {e}")
+            inbox = self.agent.inboxes.get(performative)
+            if inbox is None:
+                logger.warning("Truck %s ignoring unexpected %s from %s", self.agent.jid, performative, sender)
+                return
+            inbox.put_nowait((sender, payload))
 
     async def setup(self):
-        print(f"Truck {self.jid} starting at depot {self.position}")
-        print(f"Initial fuel level: {self.fuel_level:.2f}L")
-        print(f"Fuel threshold: {self.fuel_threshold:.2f}L")
-        print(f"Waste capacity: {self.waste_capacity}L")
-
-        # Create and add templates
-        cfp_template = Template()
-        cfp_template.set_metadata("performative", "cfp")
-
-        accept_template = Template()
-        accept_template.set_metadata("performative", "accept-proposal")
-
-        reject_template = Template()
-        reject_template.set_metadata("performative", "reject-proposal")
-
-        # Add behaviors with templates
-        self.add_behaviour(self.HandleCFP(), template=cfp_template)
-        self.add_behaviour(self.HandleAcceptance(), template=accept_template)
-        self.add_behaviour(self.HandleRejection(), template=reject_template)
\ No newline at end of file
+        logger.info("Truck %s starting at depot %s", self.jid, self.position)
+        logger.debug("Initial fuel level: %.2fL", self.fuel_level)
+        logger.debug("Fuel threshold: %.2fL", self.fuel_threshold)
+        logger.debug("Waste capacity: %sL", self.waste_capacity)
+
+        # Add behaviors
+        self.add_behaviour(self.DispatchMessages())
+        self.add_behaviour(self.HandleCFP())
+        self.add_behaviour(self.HandleAcceptance())
+        self.add_behaviour(self.MalfunctionMonitor(period=self.env.config['time']['real_seconds_per_hour']))
\ No newline at end of file